@@ -1,20 +1,22 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
-import json
+import orjson
 import random
+import secrets
 import string
 import asyncio
+from asyncio import create_task as _create_task
+import logging
 from typing import Dict, List, Optional
-from datetime import datetime
-import time
+from time import monotonic as _mono, time as _time
 import os
 from dotenv import load_dotenv
 from vs_ai.ai_player import EntropyTicTacToeAI
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
 
 # Add CORS middleware
@@ -49,13 +51,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage for rooms and connections
-rooms: Dict[str, dict] = {}
-connections: Dict[str, List[WebSocket]] = {}
+# In-memory storage for rooms
+rooms: Dict[str, "Room"] = {}
+
+ROOM_CODE_ALPHABET = string.ascii_uppercase + string.digits
+ROOM_CODE_LENGTH = 6
+ROOM_CODE_SPACE = len(ROOM_CODE_ALPHABET) ** ROOM_CODE_LENGTH
+
+# Outbound messages are queued per client and flushed by a writer task
+OUT_QUEUE_SIZE = 256
+MAX_BATCH_MESSAGES = 32
+# A client that cannot take a frame within this many seconds has stopped reading and is dropped
+SEND_TIMEOUT = 5.0
+# Rooms created ahead of a connection (AI rooms) are dropped if nobody joins within this many seconds
+ROOM_IDLE_TTL = 120.0
+idle_room_warned = False
+
+# All possible lines (rows, columns, diagonals)
+LINES = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # rows
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # columns
+    (0, 4, 8), (2, 4, 6)  # diagonals
+)
+# Lines through each cell, and a bitmask of the other cells sharing a line with it
+LINES_BY_CELL = tuple(tuple(line for line in LINES if cell in line) for cell in range(9))
+PEER_MASKS = tuple(
+    sum(1 << pos for pos in {pos for line in LINES_BY_CELL[cell] for pos in line if pos != cell})
+    for cell in range(9)
+)
+
+# Winning lines as bitmasks over cells 0..8 (bit i is cell i), in LINES order
+WIN_MASKS = tuple(sum(1 << pos for pos in line) for line in LINES)
+ALL_CELLS = 0b111111111
+# Checked before shifting, since a negative position would raise instead of being rejected
+VALID_POSITIONS = frozenset(range(9))
 
 class Game:
+    __slots__ = (
+        'board', 'hidden_symbols', 'first_number_is_x', 'probabilities', 'phase',
+        'current_turn', 'placed_pieces', 'revealed_cells', 'winner', 'game_over',
+        'play_again_votes', 'turn_start_time', 'turn_timeout', 'turn_id',
+        'last_monty_position', 'player_turn_counts', 'monty_hall_state',
+        'placed_mask', 'revealed_mask', 'hidden_x_mask', 'x_mask', 'o_mask', '_state_version', '_last_state_snapshot',
+        'ai_mode', 'ai_player_id', 'ai_player', '_state_template'
+    )
+    
     def __init__(self, ai_mode=False, ai_player_id=None, ai_difficulty="expert"):
-        self.board = [None] * 9  # 9 cells, None means empty
+        self.board = [None] * 9  # 9 cells, None means empty; sent to clients, game logic reads the bitboards
         self.hidden_symbols = self._generate_hidden_symbols()
         # Randomly decide if first number shows X or O probability
         self.first_number_is_x = random.choice([True, False])
@@ -63,15 +105,26 @@ class Game:
         self.phase = "placement"  # "placement" or "reveal"
         self.current_turn = 0  # 0 or 1 for player index
         self.placed_pieces = 1  # Start with 1 because center is auto-placed
-        self.revealed_cells = [False] * 9
+        self.revealed_cells = [False] * 9  # Client-facing mirror of revealed_mask
         self.winner = None
         self.game_over = False
         self.play_again_votes = [False, False]  # Track play again votes
         self.turn_start_time = None  # Don't start timer until 2 players join
         self.turn_timeout = 30  # 30 seconds per turn
+        self.turn_id = 0  # Bumped whenever the turn timer restarts, so clients can reset their countdown
         self.last_monty_position = None  # Store Monty Hall position for choice
         self.player_turn_counts = [0, 0]  # Track turn counts for each player
         self.monty_hall_state = None  # Track active Monty Hall state
+        self.placed_mask = 0  # Bitboard of cells holding a piece
+        self.revealed_mask = 0  # Bitboard of revealed cells
+        self.hidden_x_mask = 0  # Bitboard of cells whose hidden symbol is X
+        for i, symbol in enumerate(self.hidden_symbols):
+            if symbol == 'X':
+                self.hidden_x_mask |= 1 << i
+        self.x_mask = 0  # Bitboard of revealed X cells
+        self.o_mask = 0  # Bitboard of revealed O cells
+        self._state_version = 0  # Version of the most recent state snapshot
+        self._last_state_snapshot = {}  # player_id -> (version, state) last sent to that player
         
         # AI settings
         self.ai_mode = ai_mode
@@ -82,32 +135,49 @@ class Game:
         
         # Auto-place center piece at start (but don't reveal it)
         self.board[4] = "placed"
+        self.placed_mask = 1 << 4
+        
+        # Shares the mutable lists with the game, so get_state only fills in the scalars
+        self._state_template = {
+            "board": self.board,
+            "probabilities": self.probabilities,
+            "phase": None,
+            "current_turn": None,
+            "revealed_cells": self.revealed_cells,
+            "winner": None,
+            "game_over": None,
+            "player_id": None,
+            "play_again_votes": self.play_again_votes,
+            "turn_time_remaining": None,
+            "turn_timeout": self.turn_timeout,
+            "turn_id": None,
+            "monty_hall_state": None
+        }
         
     def _generate_hidden_symbols(self) -> List[str]:
         """Generate the hidden symbol distribution (5 of one, 4 of the other)"""
         # Randomly decide which symbol gets 5
-        symbols = ['X', 'O']
-        majority_symbol = random.choice(symbols)
-        minority_symbol = 'O' if majority_symbol == 'X' else 'X'
+        majority_symbol, minority_symbol = random.choice((('X', 'O'), ('O', 'X')))
         
-        # Create the distribution
-        symbol_list = [majority_symbol] * 5 + [minority_symbol] * 4
-        random.shuffle(symbol_list)
-        return symbol_list
+        # Pick the majority cells in a single draw instead of shuffling a full list
+        majority_cells = set(random.sample(range(9), 5))
+        return [majority_symbol if i in majority_cells else minority_symbol for i in range(9)]
     
     def _generate_probabilities(self) -> List[tuple]:
         """Generate probability pairs for each cell"""
+        # Draw the probability of every cell's actual symbol in one batch
+        actual_probs = random.choices(range(60, 96), k=9)
+        
         probabilities = []
-        for i in range(9):
+        for actual_symbol, actual_prob in zip(self.hidden_symbols, actual_probs):
             # Generate probabilities biased toward actual symbol
-            actual_symbol = self.hidden_symbols[i]
             if actual_symbol == 'X':
                 # X is the actual symbol, so X probability is higher
-                x_prob = random.randint(60, 95)
+                x_prob = actual_prob
                 o_prob = 100 - x_prob
             else:
                 # O is the actual symbol, so O probability is higher
-                o_prob = random.randint(60, 95)
+                o_prob = actual_prob
                 x_prob = 100 - o_prob
             
             # Randomly arrange which probability comes first based on game setting
@@ -120,13 +190,14 @@ class Game:
     def reset_turn_timer(self):
         """Reset the turn timer when turn changes"""
         if self.turn_start_time is not None:  # Only reset if timer was already started
-            self.turn_start_time = time.time()
+            self.turn_start_time = _mono()
+            self.turn_id += 1
     
     def get_turn_time_remaining(self) -> int:
         """Get remaining time for current turn in seconds"""
         if self.turn_start_time is None:
             return 0  # Timer not started yet
-        elapsed = time.time() - self.turn_start_time
+        elapsed = _mono() - self.turn_start_time
         remaining = max(0, self.turn_timeout - int(elapsed))
         return remaining
     
@@ -146,7 +217,8 @@ class Game:
     def start_timer(self):
         """Start the turn timer for the first time"""
         if self.turn_start_time is None:
-            self.turn_start_time = time.time()
+            self.turn_start_time = _mono()
+            self.turn_id += 1
     
     def stop_timer(self):
         """Stop the turn timer (when players leave)"""
@@ -154,10 +226,12 @@ class Game:
 
     def place_piece(self, position: int) -> bool:
         """Place a piece during placement phase"""
-        if self.phase != "placement" or self.board[position] is not None or position == 4:
+        if (self.phase != "placement" or position not in VALID_POSITIONS or
+            self.placed_mask >> position & 1):
             return False
         
         self.board[position] = "placed"
+        self.placed_mask |= 1 << position
         self.placed_pieces += 1
         
         # Transition to reveal phase when all pieces are placed
@@ -171,8 +245,9 @@ class Game:
     def reveal_piece(self, position: int, player_id: int = None) -> dict:
         """Reveal a piece during reveal phase with Monty Hall mechanism"""
         if (self.phase != "reveal" or 
-            self.board[position] is None or 
-            self.revealed_cells[position]):
+            position not in VALID_POSITIONS or 
+            not self.placed_mask >> position & 1 or 
+            self.revealed_mask >> position & 1):
             return {"success": False, "error": "Invalid reveal"}
         
         # If we're in active Monty Hall state, handle the choice
@@ -247,22 +322,13 @@ class Game:
             monty_symbol = self.hidden_symbols[monty_position]
             
             # Actually reveal the Monty Hall tile publicly
-            self.revealed_cells[monty_position] = True
-            self.board[monty_position] = monty_symbol
+            self._reveal_cell(monty_position)
             
             # Update probabilities
             self._update_probabilities_after_reveal(monty_symbol)
             
-            # Check for win condition
-            self._check_win_condition()
-            
-            # Check for draw
-            if all(self.revealed_cells) and not self.winner:
-                self.game_over = True
-                
-            # If game is over, reveal all pieces
-            if self.game_over:
-                self._reveal_all_pieces()
+            # Check for a win or draw
+            self._finalize_after_reveal()
             
             return {
                 "success": True,
@@ -275,51 +341,29 @@ class Game:
         
     def _trigger_monty_hall(self, chosen_position: int, chosen_symbol: str) -> dict:
         """Trigger Monty Hall mechanism - returns info but doesn't reveal publicly"""
-        # Define all possible lines
-        lines = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]  # diagonals
-        ]
+        # Candidates are the unrevealed cells sharing any line with the chosen position
+        candidate_mask = PEER_MASKS[chosen_position] & ~self.revealed_mask
         
-        # Find lines containing the chosen position and try all of them
-        relevant_lines = [line for line in lines if chosen_position in line]
-        
-        if not relevant_lines:
+        if not candidate_mask:
             return {"triggered": False}
         
-        # Try each line until we find candidates
-        all_candidates = []
-        for line in relevant_lines:
-            candidates = [pos for pos in line 
-                         if pos != chosen_position and not self.revealed_cells[pos]]
-            all_candidates.extend(candidates)
-        
-        # Remove duplicates
-        all_candidates = list(set(all_candidates))
-        
-        if not all_candidates:
-            return {"triggered": False}
-        
-        # Apply 80/20 rule for symbol selection
-        opposite_symbol = 'O' if chosen_symbol == 'X' else 'X'
-        
-        # Separate candidates by symbol
-        opposite_candidates = [pos for pos in all_candidates 
-                             if self.hidden_symbols[pos] == opposite_symbol]
-        same_candidates = [pos for pos in all_candidates 
-                          if self.hidden_symbols[pos] == chosen_symbol]
+        # Separate candidates by symbol for the 80/20 rule
+        x_candidates = candidate_mask & self.hidden_x_mask
+        o_candidates = candidate_mask & ~self.hidden_x_mask
+        if chosen_symbol == 'X':
+            opposite_mask, same_mask = o_candidates, x_candidates
+        else:
+            opposite_mask, same_mask = x_candidates, o_candidates
+        opposite_candidates = [pos for pos in range(9) if opposite_mask >> pos & 1]
+        same_candidates = [pos for pos in range(9) if same_mask >> pos & 1]
         
         # 80% chance to reveal opposite, 20% chance to reveal same
-        if random.randint(1, 100) <= 80 and opposite_candidates:
+        if random.random() < 0.8 and opposite_candidates:
             reveal_position = random.choice(opposite_candidates)
         elif same_candidates:
             reveal_position = random.choice(same_candidates)
-        elif opposite_candidates:
-            reveal_position = random.choice(opposite_candidates)
         else:
-            # Fallback: just pick any available candidate
-            reveal_position = random.choice(all_candidates)
+            reveal_position = random.choice(opposite_candidates)
         
         # DON'T actually reveal the piece publicly - just return the info
         revealed_symbol = self.hidden_symbols[reveal_position]
@@ -343,23 +387,13 @@ class Game:
     def _complete_private_reveal(self, position: int) -> dict:
         """Complete reveal of original tile (public reveal, but player had private info to make choice)"""
         # Actually reveal the tile publicly - both players see it
-        self.revealed_cells[position] = True
-        revealed_symbol = self.hidden_symbols[position]
-        self.board[position] = revealed_symbol
+        revealed_symbol = self._reveal_cell(position)
         
         # Update probabilities for remaining hidden pieces
         self._update_probabilities_after_reveal(revealed_symbol)
         
-        # Check for win condition
-        self._check_win_condition()
-        
-        # Check for draw (all revealed, no winner)
-        if all(self.revealed_cells) and not self.winner:
-            self.game_over = True
-        
-        # If game is over, reveal all pieces
-        if self.game_over:
-            self._reveal_all_pieces()
+        # Check for a win or draw
+        self._finalize_after_reveal()
         
         return {
             "success": True,
@@ -371,23 +405,13 @@ class Game:
     
     def _complete_public_reveal(self, position: int) -> dict:
         """Complete a public reveal (tile gets revealed to everyone)"""
-        self.revealed_cells[position] = True
-        revealed_symbol = self.hidden_symbols[position]
-        self.board[position] = revealed_symbol
+        revealed_symbol = self._reveal_cell(position)
         
         # Update probabilities for remaining hidden pieces
         self._update_probabilities_after_reveal(revealed_symbol)
         
-        # Check for win condition
-        self._check_win_condition()
-        
-        # Check for draw (all revealed, no winner)
-        if all(self.revealed_cells) and not self.winner:
-            self.game_over = True
-        
-        # If game is over, reveal all pieces
-        if self.game_over:
-            self._reveal_all_pieces()
+        # Check for a win or draw
+        self._finalize_after_reveal()
         
         return {
             "success": True,
@@ -396,141 +420,216 @@ class Game:
             "symbol": revealed_symbol
         }
     
+    def _reveal_cell(self, position: int) -> str:
+        """Mark a cell as revealed and record it on the symbol bitboards"""
+        revealed_symbol = self.hidden_symbols[position]
+        self.revealed_cells[position] = True
+        self.board[position] = revealed_symbol
+        bit = 1 << position
+        self.revealed_mask |= bit
+        if self.hidden_x_mask & bit:
+            self.x_mask |= bit
+        else:
+            self.o_mask |= bit
+        return revealed_symbol
+    
     def _update_probabilities_after_reveal(self, revealed_symbol: str):
         """Update probabilities using Monty Hall-style logic"""
-        # Get lines containing the last revealed piece
-        last_revealed = next(i for i in range(9) if self.revealed_cells[i] and self.board[i] == revealed_symbol)
-        
-        # Define all possible lines (rows, columns, diagonals)
-        lines = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]  # diagonals
-        ]
-        
-        # Count remaining symbols globally
-        remaining_x = sum(1 for i, symbol in enumerate(self.hidden_symbols) 
-                         if not self.revealed_cells[i] and symbol == 'X')
-        remaining_o = sum(1 for i, symbol in enumerate(self.hidden_symbols) 
-                         if not self.revealed_cells[i] and symbol == 'O')
-        
-        total_remaining = remaining_x + remaining_o
+        # Count remaining symbols globally from the bitboards
+        hidden_mask = ALL_CELLS & ~self.revealed_mask
+        total_remaining = bin(hidden_mask).count('1')
         if total_remaining == 0:
             return
+        remaining_x = bin(hidden_mask & self.hidden_x_mask).count('1')
+        remaining_o = total_remaining - remaining_x
             
         # Base probabilities
         base_x_prob = remaining_x / total_remaining
         base_o_prob = remaining_o / total_remaining
         
+        # Count the revealed symbol per line from its bitboard, then scatter each
+        # line's boost onto its cells instead of re-scanning every line per cell
+        symbol_mask = self.x_mask if revealed_symbol == 'X' else self.o_mask
+        cell_boosts = [0] * 9
+        for line, line_mask in zip(LINES, WIN_MASKS):
+            same_symbol_in_line = bin(symbol_mask & line_mask).count('1')
+            # Monty Hall effect: if revealed symbol appears in this line, boost that symbol's probability
+            boost = 0.15 * (same_symbol_in_line / 3)
+            if revealed_symbol != 'X':
+                boost = -boost
+            for pos in line:
+                cell_boosts[pos] += boost
+        
+        # Draw the bias and noise for every hidden cell in one call each
+        hidden_cells = [i for i in range(9) if hidden_mask >> i & 1]
+        symbol_biases = random.choices(range(10, 26), k=total_remaining)  # 10-25% bias
+        noises = random.choices(range(-5, 6), k=total_remaining)
+        
+        # Loop invariants hoisted into locals for the per-cell loop
+        revealed_is_x = revealed_symbol == 'X'
+        hidden_x_mask = self.hidden_x_mask
+        first_number_is_x = self.first_number_is_x
+        probabilities = self.probabilities
+        
         # Apply Monty Hall logic: pieces in same lines as revealed pieces get probability boosts
-        for i in range(9):
-            if not self.revealed_cells[i]:
-                # Start with base probability
-                x_prob = base_x_prob
-                o_prob = base_o_prob
-                
-                # Check if this cell shares lines with revealed pieces
-                monty_hall_boost = 0
-                for line in lines:
-                    if i in line:
-                        # Count revealed pieces in this line
-                        revealed_in_line = sum(1 for pos in line if self.revealed_cells[pos])
-                        same_symbol_in_line = sum(1 for pos in line 
-                                                if self.revealed_cells[pos] and self.board[pos] == revealed_symbol)
-                        
-                        if revealed_in_line > 0:
-                            # Monty Hall effect: knowing one door increases odds on remaining doors
-                            if same_symbol_in_line > 0:
-                                # If revealed symbol appears in this line, boost that symbol's probability
-                                if revealed_symbol == 'X':
-                                    monty_hall_boost += 0.15 * (same_symbol_in_line / 3)
-                                else:
-                                    monty_hall_boost -= 0.15 * (same_symbol_in_line / 3)
-                
-                # Apply the boost
-                if revealed_symbol == 'X':
-                    x_prob = min(0.9, x_prob + monty_hall_boost)
-                    o_prob = 1.0 - x_prob
-                else:
-                    o_prob = min(0.9, o_prob + monty_hall_boost)
-                    x_prob = 1.0 - o_prob
-                
-                # Add bias toward the actual symbol in this cell (like placement phase)
-                actual_symbol = self.hidden_symbols[i]
-                if actual_symbol == 'X':
-                    # This cell actually contains X, boost X probability
-                    symbol_bias = random.randint(10, 25) / 100.0  # 10-25% bias
-                    x_prob = min(0.9, x_prob + symbol_bias)
-                    o_prob = 1.0 - x_prob
-                else:
-                    # This cell actually contains O, boost O probability  
-                    symbol_bias = random.randint(10, 25) / 100.0  # 10-25% bias
-                    o_prob = min(0.9, o_prob + symbol_bias)
-                    x_prob = 1.0 - o_prob
-                
-                # Add small random noise to maintain some uncertainty
-                noise = random.randint(-5, 5) / 100.0
-                x_prob = max(0.1, min(0.9, x_prob + noise))
+        for i, bias_percent, noise_percent in zip(hidden_cells, symbol_biases, noises):
+            # Sum of the boosts of every line this cell belongs to, applied to the base probability
+            monty_hall_boost = cell_boosts[i]
+            if revealed_is_x:
+                x_prob = min(0.9, base_x_prob + monty_hall_boost)
                 o_prob = 1.0 - x_prob
-                
-                # Arrange probabilities based on game's random assignment
-                if self.first_number_is_x:
-                    self.probabilities[i] = (int(x_prob * 100), int(o_prob * 100))
-                else:
-                    self.probabilities[i] = (int(o_prob * 100), int(x_prob * 100))
+            else:
+                o_prob = min(0.9, base_o_prob + monty_hall_boost)
+                x_prob = 1.0 - o_prob
+            
+            # Add bias toward the actual symbol in this cell (like placement phase)
+            symbol_bias = bias_percent / 100.0
+            if hidden_x_mask >> i & 1:
+                # This cell actually contains X, boost X probability
+                x_prob = min(0.9, x_prob + symbol_bias)
+            else:
+                # This cell actually contains O, boost O probability
+                o_prob = min(0.9, o_prob + symbol_bias)
+                x_prob = 1.0 - o_prob
+            
+            # Add small random noise to maintain some uncertainty
+            x_prob = max(0.1, min(0.9, x_prob + noise_percent / 100.0))
+            o_prob = 1.0 - x_prob
+            
+            # Arrange probabilities based on game's random assignment
+            if first_number_is_x:
+                probabilities[i] = (int(x_prob * 100), int(o_prob * 100))
+            else:
+                probabilities[i] = (int(o_prob * 100), int(x_prob * 100))
     
     def _check_win_condition(self):
         """Check if there's a winner"""
-        win_patterns = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]  # diagonals
-        ]
-        
-        for pattern in win_patterns:
-            symbols = [self.board[i] for i in pattern]
-            if (all(self.revealed_cells[i] for i in pattern) and 
-                len(set(symbols)) == 1 and symbols[0] in ['X', 'O']):
-                self.winner = symbols[0]
-                self.game_over = True
-                return
+        for mask in WIN_MASKS:
+            if self.x_mask & mask == mask:
+                self.winner = 'X'
+            elif self.o_mask & mask == mask:
+                self.winner = 'O'
+            else:
+                continue
+            self.game_over = True
+            return
+    
+    def _finalize_after_reveal(self):
+        """Check for a win or draw after a reveal and reveal everything once the game is over"""
+        self._check_win_condition()
+        
+        # Draw: all revealed, no winner
+        if self.revealed_mask == ALL_CELLS and not self.winner:
+            self.game_over = True
+        
+        if self.game_over:
+            self._reveal_all_pieces()
     
     def _reveal_all_pieces(self):
         """Reveal all pieces when game ends"""
         for i in range(9):
-            if not self.revealed_cells[i]:
-                self.revealed_cells[i] = True
-                self.board[i] = self.hidden_symbols[i]
+            if not self.revealed_mask >> i & 1:
+                self._reveal_cell(i)
     
     def reset_game(self):
         """Reset game for play again"""
         ai_mode = getattr(self, 'ai_mode', False)
         ai_player_id = getattr(self, 'ai_player_id', None)
         ai_difficulty = self.ai_player.difficulty if hasattr(self, 'ai_player') and self.ai_player else 'expert'
+        turn_id = self.turn_id
         self.__init__(ai_mode=ai_mode, ai_player_id=ai_player_id, ai_difficulty=ai_difficulty)
+        # Keep counting so the first turn of the new game never looks like the last one of the old
+        self.turn_id = turn_id
     
     def vote_play_again(self, player_id: int) -> bool:
         """Vote to play again, returns True if both players voted"""
         self.play_again_votes[player_id] = True
         return all(self.play_again_votes)
     
+    def get_public_state(self) -> dict:
+        """Get the game state shared by all players; player_id and monty_hall_state are left as None"""
+        state = self._state_template.copy()
+        state["phase"] = self.phase
+        state["current_turn"] = self.current_turn
+        state["winner"] = self.winner
+        state["game_over"] = self.game_over
+        state["turn_time_remaining"] = self.get_turn_time_remaining() if self.turn_start_time is not None else None
+        state["turn_timeout"] = self.turn_timeout
+        state["turn_id"] = self.turn_id
+        return state
+    
     def get_state(self, player_id: int) -> dict:
         """Get game state for a specific player"""
+        state = self.get_public_state()
+        state["player_id"] = player_id
+        state["monty_hall_state"] = self.monty_hall_state if self.monty_hall_state and self.monty_hall_state["player_id"] == player_id else None
+        return state
+    
+    def next_state_version(self) -> int:
+        """Allocate a new state version"""
+        self._state_version += 1
+        return self._state_version
+    
+    def get_state_delta(self, player_id: int, client_version: Optional[int], state: Optional[dict] = None,
+                        version: Optional[int] = None) -> dict:
+        """Get a state message for a player, as a delta against what they last received when possible"""
+        if state is None:
+            state = self.get_state(player_id)
+        if version is None:
+            version = self.next_state_version()
+        last_snapshot = self._last_state_snapshot.get(player_id)
+        
+        # Copy the mutable lists so later in-place updates don't leak into the snapshot
+        self._last_state_snapshot[player_id] = (
+            version,
+            {key: list(value) if isinstance(value, list) else value for key, value in state.items()}
+        )
+        
+        # Fall back to a full state if the client is not on the snapshot we diff against
+        if last_snapshot is None or last_snapshot[0] != client_version:
+            return {"type": "game_state", "version": version, "data": state}
+        
+        last_version, last_state = last_snapshot
         return {
-            "board": self.board,
-            "probabilities": self.probabilities,
-            "phase": self.phase,
-            "current_turn": self.current_turn,
-            "revealed_cells": self.revealed_cells,
-            "winner": self.winner,
-            "game_over": self.game_over,
-            "player_id": player_id,
-            "play_again_votes": self.play_again_votes,
-            "turn_time_remaining": self.get_turn_time_remaining() if self.turn_start_time is not None else None,
-            "turn_timeout": self.turn_timeout,
-            "monty_hall_state": self.monty_hall_state if self.monty_hall_state and self.monty_hall_state["player_id"] == player_id else None
+            "type": "game_state_delta",
+            "version": version,
+            "base": last_version,
+            "changes": {key: value for key, value in state.items() if last_state.get(key) != value}
         }
 
+def _placement_score(position: int, placed_mask: int) -> int:
+    """Static placement value of a position for a given set of placed cells"""
+    score = 0
+    
+    # Strategic positions (corners and center area)
+    strategic_positions = [0, 2, 6, 8, 1, 3, 5, 7]  # corners first, then edges
+    if position in strategic_positions[:4]:  # corners
+        score += 30
+    elif position in strategic_positions[4:]:  # edges
+        score += 20
+    
+    # Check if position blocks or creates potential lines
+    for line in LINES_BY_CELL[position]:
+        line_pieces = sum(1 for pos in line if placed_mask >> pos & 1)
+        if line_pieces == 1:  # One piece in line, good to add another
+            score += 15
+        elif line_pieces == 2:  # Two pieces, very important position
+            score += 50
+    return score
+
+def _reveal_line_score(position: int, revealed_mask: int) -> int:
+    """Bonus for revealing a position that shares lines with revealed cells"""
+    score = 0
+    for line in LINES_BY_CELL[position]:
+        revealed_in_line = sum(1 for pos in line if revealed_mask >> pos & 1)
+        if revealed_in_line >= 1:  # Already have revelations in this line
+            score += 25
+    return score
+
+# Scores indexed as [position][bitboard]; 9 x 512 entries each, built once at import
+PLACEMENT_SCORES = tuple(tuple(_placement_score(pos, mask) for mask in range(ALL_CELLS + 1)) for pos in range(9))
+REVEAL_LINE_SCORES = tuple(tuple(_reveal_line_score(pos, mask) for mask in range(ALL_CELLS + 1)) for pos in range(9))
+
 class AIOpponent:
     """Algorithmic AI opponent for single-player mode"""
     
@@ -591,30 +690,7 @@ class AIOpponent:
     
     def _evaluate_placement_position(self, position, game) -> float:
         """Evaluate placement position value"""
-        score = 0
-        
-        # Strategic positions (corners and center area)
-        strategic_positions = [0, 2, 6, 8, 1, 3, 5, 7]  # corners first, then edges
-        if position in strategic_positions[:4]:  # corners
-            score += 30
-        elif position in strategic_positions[4:]:  # edges
-            score += 20
-        
-        # Check if position blocks or creates potential lines
-        lines = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]  # diagonals
-        ]
-        
-        for line in lines:
-            if position in line:
-                line_pieces = sum(1 for pos in line if game.board[pos] is not None)
-                if line_pieces == 1:  # One piece in line, good to add another
-                    score += 15
-                elif line_pieces == 2:  # Two pieces, very important position
-                    score += 50
-        
+        score = PLACEMENT_SCORES[position][game.placed_mask]
         return score + random.random() * 5  # Add small random factor
     
     def _evaluate_reveal_position(self, position, game) -> float:
@@ -627,36 +703,167 @@ class AIOpponent:
         score += max_prob
         
         # Check if revealing could create winning lines
-        lines = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]  # diagonals
-        ]
-        
-        for line in lines:
-            if position in line:
-                revealed_in_line = sum(1 for pos in line if game.revealed_cells[pos])
-                if revealed_in_line >= 1:  # Already have revelations in this line
-                    score += 25
+        score += REVEAL_LINE_SCORES[position][game.revealed_mask]
         
         return score + random.random() * 10  # Add random factor
 
+class Room:
+    """A game room: its players, game and chat history"""
+    __slots__ = (
+        'code', 'players', 'players_by_id', 'game', 'chat_history', 'ai_mode', 'ai_player_id',
+        'ai_difficulty', 'closed', 'timeout_handle', 'ai_task', 'room_info'
+    )
+    
+    def __init__(self, code: str, game: Game, ai_mode: bool = False,
+                 ai_player_id: Optional[int] = None, ai_difficulty: Optional[str] = None):
+        self.code = code
+        self.players: List[dict] = []
+        self.players_by_id: Dict[int, dict] = {}
+        self.game = game
+        self.chat_history: List[dict] = []
+        self.ai_mode = ai_mode
+        self.ai_player_id = ai_player_id
+        self.ai_difficulty = ai_difficulty
+        self.closed = False  # Set once the room is removed; pending tasks check it
+        self.timeout_handle: Optional[asyncio.TimerHandle] = None  # Fires when the current turn expires
+        self.ai_task: Optional[asyncio.Task] = None  # The AI move in progress, if any
+        self.room_info = None
+        self.rebuild_room_info()
+    
+    def rebuild_room_info(self):
+        """Rebuild the cached room info; only needed when the player list changes"""
+        self.room_info = {
+            "code": self.code,
+            "players": [{"id": p["id"], "name": p["name"], "is_ai": p.get("is_ai", False)} for p in self.players],
+            "waiting_for_player": len(self.players) < (1 if self.ai_mode else 2),
+            "ai_mode": self.ai_mode
+        }
+    
+    def get_player(self, player_id: int) -> Optional[dict]:
+        """Get a player entry by id"""
+        return self.players_by_id.get(player_id)
+    
+    def add_player(self, player: dict):
+        """Add a player entry to the room"""
+        self.players.append(player)
+        self.players_by_id[player["id"]] = player
+    
+    def remove_player(self, player_id: int):
+        """Remove a player entry from the room"""
+        player = self.players_by_id.pop(player_id, None)
+        if player is not None:
+            self.players.remove(player)
+    
+    def broadcast(self, message: dict):
+        """Broadcast a message to all players in the room"""
+        # Encode once and queue the same payload for every player
+        payload = orjson.dumps(message)
+        for player in self.players:
+            if player.get("out_queue"):
+                enqueue_message(player, payload)
+    
+    def broadcast_state(self):
+        """Broadcast current game state to all players"""
+        game = self.game
+        
+        # Build the shared state once; only player_id and monty_hall_state differ per player
+        base_state = game.get_public_state()
+        
+        # Every player gets the same version, so players who are in sync usually
+        # get identical deltas and the encoded payload can be reused
+        version = game.next_state_version()
+        last_message = last_payload = None
+        
+        for i, player in enumerate(self.players):
+            # Skip AI players (they don't have websockets)
+            if player.get("is_ai", False) or not player.get("out_queue"):
+                continue
+            
+            monty_hall_state = game.monty_hall_state if game.monty_hall_state and game.monty_hall_state["player_id"] == i else None
+            state = {**base_state, "player_id": i, "monty_hall_state": monty_hall_state}
+            
+            # Make room before building the message: the message dropped to make room may be the
+            # state a delta would be based on, and dropping it forces a full snapshot instead
+            if player["out_queue"].full():
+                drop_oldest_message(player)
+            
+            # Send only what changed since this player's last state, or a full snapshot if they are out of sync
+            message = game.get_state_delta(i, player.get("state_version"), state, version)
+            player["state_version"] = version
+            if message["type"] == "game_state":
+                message["room_info"] = self.room_info
+            if message != last_message:
+                last_message, last_payload = message, orjson.dumps(message)
+            enqueue_message(player, last_payload)
+
 def generate_room_code() -> str:
     """Generate a unique 6-character room code"""
+    # Room codes are the only thing needed to join a room, so draw them from
+    # the OS CSPRNG rather than the predictable random module
     while True:
-        code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        # One CSPRNG draw over the whole code space, then base-36 digits
+        n = secrets.randbelow(ROOM_CODE_SPACE)
+        chars = []
+        for _ in range(ROOM_CODE_LENGTH):
+            n, digit = divmod(n, len(ROOM_CODE_ALPHABET))
+            chars.append(ROOM_CODE_ALPHABET[digit])
+        code = ''.join(chars)
         if code not in rooms:
             return code
 
+def expire_idle_room(room: Room):
+    """Drop a room that nobody joined within ROOM_IDLE_TTL"""
+    global idle_room_warned
+    if room.closed or room.players or rooms.get(room.code) is not room:
+        return
+    room.closed = True
+    del rooms[room.code]
+    if not idle_room_warned:
+        idle_room_warned = True
+        logger.warning("Removed room %s after nobody joined it for %.0fs", room.code, ROOM_IDLE_TTL)
+
+def schedule_turn_timeout(room: Room):
+    """(Re)arm the room's turn timeout for the current turn, replacing any pending one"""
+    cancel_turn_timeout(room)
+    game = room.game
+    if game.turn_start_time is None or game.game_over:
+        return
+    delay = game.turn_start_time + game.turn_timeout - _mono()
+    room.timeout_handle = asyncio.get_running_loop().call_later(delay, on_turn_timeout, room)
+
+def cancel_turn_timeout(room: Room):
+    """Cancel the room's pending turn timeout, if any"""
+    if room.timeout_handle is not None:
+        room.timeout_handle.cancel()
+        room.timeout_handle = None
+
+def on_turn_timeout(room: Room):
+    """Switch to the next player when a turn runs out of time"""
+    room.timeout_handle = None
+    game = room.game
+    if room.closed or game.game_over or game.turn_start_time is None or len(room.players) != 2:
+        return
+    
+    # Broadcast timeout message
+    room.broadcast({
+        "type": "timeout",
+        "data": {
+            "message": f"Turn timeout! Player {game.current_turn + 1} ran out of time."
+        }
+    })
+    
+    # Handle timeout by switching to next player; this also starts the AI if it is next
+    advance_turn(room)
+
 @app.websocket("/ws/{room_code}")
 async def websocket_endpoint(websocket: WebSocket, room_code: str):
     await websocket.accept()
     
     # Wait for join message with player name
     try:
-        join_message = await websocket.receive_json()
+        join_message = orjson.loads(await websocket.receive_text())
         if join_message.get("type") != "join":
-            await websocket.send_json({
+            await send_message(websocket, {
                 "type": "error",
                 "message": "Expected join message"
             })
@@ -664,8 +871,11 @@ async def websocket_endpoint(websocket: WebSocket, room_code: str):
             return
         
         player_name = join_message.get("player_name", "Anonymous")
-    except:
-        await websocket.send_json({
+    except WebSocketDisconnect:
+        return
+    except (ValueError, KeyError, AttributeError):
+        # Not JSON, a binary frame, or not a JSON object
+        await send_message(websocket, {
             "type": "error",
             "message": "Invalid join message"
         })
@@ -673,21 +883,17 @@ async def websocket_endpoint(websocket: WebSocket, room_code: str):
         return
     
     # Initialize room if it doesn't exist
-    if room_code not in rooms:
-        rooms[room_code] = {
-            "players": [],
-            "game": Game(),
-            "chat_history": []
-        }
-        connections[room_code] = []
+    room = rooms.get(room_code)
+    if room is None:
+        room = rooms[room_code] = Room(room_code, Game())
     
     # Check if this is an AI room
-    is_ai_room = rooms[room_code].get("ai_mode", False)
+    is_ai_room = room.ai_mode
     
     # Check if room is full
     max_players = 1 if is_ai_room else 2
-    if len(rooms[room_code]["players"]) >= max_players:
-        await websocket.send_json({
+    if len(room.players) >= max_players:
+        await send_message(websocket, {
             "type": "error",
             "message": "Room is full"
         })
@@ -695,171 +901,160 @@ async def websocket_endpoint(websocket: WebSocket, room_code: str):
         return
     
     # Add player to room
-    player_id = len(rooms[room_code]["players"])
-    rooms[room_code]["players"].append({
+    player_id = len(room.players)
+    out_queue = asyncio.Queue(maxsize=OUT_QUEUE_SIZE)
+    player = {
         "id": player_id,
         "name": player_name,
-        "websocket": websocket
-    })
-    connections[room_code].append(websocket)
+        "websocket": websocket,
+        "out_queue": out_queue
+    }
+    room.add_player(player)
+    writer_task = _create_task(client_writer(websocket, out_queue))
     
     # Add AI player if this is an AI room and human just joined
-    if is_ai_room and len(rooms[room_code]["players"]) == 1:
-        ai_player_id = rooms[room_code]["ai_player_id"]
-        ai_difficulty = rooms[room_code]["ai_difficulty"]
-        rooms[room_code]["players"].append({
-            "id": ai_player_id,
-            "name": f"AI ({ai_difficulty.title()})",
+    if is_ai_room and len(room.players) == 1:
+        room.add_player({
+            "id": room.ai_player_id,
+            "name": f"AI ({room.ai_difficulty.title()})",
             "websocket": None,  # AI doesn't have websocket
             "is_ai": True
         })
+    room.rebuild_room_info()
     
     # Get game instance
-    game = rooms[room_code]["game"]
+    game = room.game
     
     # Start timer if we have enough players (2 for normal, 1+AI for AI mode)
     required_players = 1 if is_ai_room else 2
-    if len(rooms[room_code]["players"]) >= required_players:
+    if len(room.players) >= required_players:
         game.start_timer()
-    
-    # Send initial game state
-    await websocket.send_json({
-        "type": "game_state",
-        "data": game.get_state(player_id),
-        "room_info": {
-            "code": room_code,
-            "players": [{"id": p["id"], "name": p["name"], "is_ai": p.get("is_ai", False)} for p in rooms[room_code]["players"]],
-            "waiting_for_player": len(rooms[room_code]["players"]) < (1 if is_ai_room else 2),
-            "ai_mode": is_ai_room
-        }
-    })
+        schedule_turn_timeout(room)
+        # Players already waiting need the turn deadline for their countdown; the joining
+        # player has no state version yet, so it gets a full snapshot from the same broadcast
+        room.broadcast_state()
+    else:
+        # Send initial game state (always a full snapshot for a new connection)
+        state_message = game.get_state_delta(player_id, None)
+        player["state_version"] = state_message["version"]
+        enqueue_message(player, orjson.dumps({
+            **state_message,
+            "room_info": room.room_info
+        }))
     
     # Broadcast to all players that someone joined
-    await broadcast_to_room(room_code, {
+    room.broadcast({
         "type": "player_joined",
         "player": {"id": player_id, "name": player_name},
-        "room_info": {
-            "code": room_code,
-            "players": [{"id": p["id"], "name": p["name"], "is_ai": p.get("is_ai", False)} for p in rooms[room_code]["players"]],
-            "waiting_for_player": len(rooms[room_code]["players"]) < (1 if is_ai_room else 2),
-            "ai_mode": is_ai_room
-        }
+        "room_info": room.room_info
     })
     
     # Start AI turn if needed
     if is_ai_room and game.current_turn == game.ai_player_id:
-        asyncio.create_task(handle_ai_turn(room_code))
+        start_ai_turn(room)
     
     try:
-        async for message in websocket.iter_json():
-            await handle_message(room_code, player_id, message)
+        # Parse incoming messages with orjson as well, rather than Starlette's stdlib json
+        async for data in websocket.iter_text():
+            await handle_message(room, player_id, orjson.loads(data))
     
     except WebSocketDisconnect:
         pass
-    except:
-        pass
+    except Exception as e:
+        # A malformed message or a failed send ends this connection like a disconnect
+        logger.debug("Connection to room %s closed: %r", room_code, e)
     finally:
+        writer_task.cancel()
+        
         # Handle player disconnect
-        if room_code in rooms:
+        if not room.closed:
             # Stop timer if player count drops below 2
-            if len(rooms[room_code]["players"]) >= 2:
-                rooms[room_code]["game"].stop_timer()
+            if len(room.players) >= 2:
+                room.game.stop_timer()
+            cancel_turn_timeout(room)
             
             # Remove player from room
-            rooms[room_code]["players"] = [p for p in rooms[room_code]["players"] if p["id"] != player_id]
-            connections[room_code] = [conn for conn in connections[room_code] if conn != websocket]
+            room.remove_player(player_id)
+            room.rebuild_room_info()
             
             # If there are remaining players, notify them and close the room
-            if rooms[room_code]["players"]:
-                await broadcast_to_room(room_code, {
+            if room.players:
+                room.broadcast({
                     "type": "room_closed",
                     "message": f"{player_name} has left the game. Returning to lobby."
                 })
-                # Close all remaining connections
-                for ws in connections[room_code]:
-                    try:
-                        await ws.close()
-                    except:
-                        pass
+                # Close all remaining connections once their queued messages are flushed
+                for other in room.players:
+                    if other.get("out_queue"):
+                        enqueue_message(other, None)
             
             # Clean up room
-            if room_code in rooms:
+            room.closed = True
+            if rooms.get(room_code) is room:
                 del rooms[room_code]
-            if room_code in connections:
-                del connections[room_code]
 
-async def handle_message(room_code: str, player_id: int, message: dict):
+async def handle_message(room: Room, player_id: int, message: dict):
     """Handle incoming WebSocket messages"""
-    if room_code not in rooms:
+    if room.closed:
         return
         
     # Check if room has enough players
-    is_ai_room = rooms[room_code].get("ai_mode", False)
+    is_ai_room = room.ai_mode
     required_players = 1 if is_ai_room else 2
     
-    if len(rooms[room_code]["players"]) < required_players:
+    if len(room.players) < required_players:
         return  # Don't process game actions until enough players
         
-    game = rooms[room_code]["game"]
+    game = room.game
     msg_type = message.get("type")
     
     if msg_type == "place_piece":
         position = message.get("position")
         if game.current_turn == player_id and game.place_piece(position):
-            await handle_piece_placed(room_code)
+            advance_turn(room)
     
     elif msg_type == "reveal_piece":
         position = message.get("position")
         if game.current_turn == player_id:
-            await handle_piece_revealed(room_code, player_id, position)
+            await handle_piece_revealed(room, player_id, position)
     
     elif msg_type == "chat_message":
         if not is_ai_room:  # Only allow chat in human vs human games
-            player_name = next((p["name"] for p in rooms[room_code]["players"] if p["id"] == player_id), f"Player {player_id + 1}")
+            player = room.get_player(player_id)
+            player_name = player["name"] if player else f"Player {player_id + 1}"
             chat_msg = {
                 "type": "chat_message",
                 "player_id": player_id,
                 "player_name": player_name,
                 "message": message.get("message", ""),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": _time()  # Epoch seconds; the client formats it
             }
-            rooms[room_code]["chat_history"].append(chat_msg)
-            await broadcast_to_room(room_code, chat_msg)
+            room.chat_history.append(chat_msg)
+            room.broadcast(chat_msg)
     
     elif msg_type == "play_again":
-        print(f"Play again request from player {player_id} in room {room_code}")
-        print(f"Is AI room: {is_ai_room}")
+        logger.debug("Play again request from player %d in room %s (AI room: %s)", player_id, room.code, is_ai_room)
         
         # In AI mode, immediately restart the game when human clicks play again
         if is_ai_room:
-            print("AI mode: Immediately restarting game")
             try:
                 # Reset game immediately without any voting
-                print("Step 1: Calling reset_game()")
                 game.reset_game()
-                print("Step 2: Calling start_timer()")
                 # Restart the timer
                 game.start_timer()
-                print("Step 3: Broadcasting game state")
-                await broadcast_game_state(room_code)
-                print("Step 4: Broadcasting game reset message")
-                await broadcast_to_room(room_code, {
+                schedule_turn_timeout(room)
+                room.broadcast_state()
+                room.broadcast({
                     "type": "game_reset",
                     "message": "New game started!"
                 })
                 
-                print("Step 5: Checking AI turn")
                 # Start AI turn if needed
                 if game.current_turn == game.ai_player_id:
-                    print(f"Starting AI turn for player {game.ai_player_id}")
-                    asyncio.create_task(handle_ai_turn(room_code))
-                else:
-                    print(f"Human turn - current turn: {game.current_turn}")
-                print("Play again complete!")
-            except Exception as e:
-                print(f"Error in play again: {e}")
-                import traceback
-                traceback.print_exc()
+                    start_ai_turn(room)
+                logger.debug("Room %s restarted, player %d to move", room.code, game.current_turn)
+            except Exception:
+                logger.exception("Error in play again in room %s", room.code)
         else:
             # Regular 2-player room logic with voting
             if game.vote_play_again(player_id):
@@ -867,45 +1062,26 @@ async def handle_message(room_code: str, player_id: int, message: dict):
                 game.reset_game()
                 # Restart the timer
                 game.start_timer()
-                await broadcast_game_state(room_code)
-                await broadcast_to_room(room_code, {
+                schedule_turn_timeout(room)
+                room.broadcast_state()
+                room.broadcast({
                     "type": "game_reset",
                     "message": "New game started!"
                 })
             else:
                 # Broadcast that this player wants to play again
-                await broadcast_game_state(room_code)
-                await broadcast_to_room(room_code, {
+                room.broadcast_state()
+                room.broadcast({
                     "type": "play_again_vote",
                     "player_id": player_id,
                     "message": f"Player {player_id + 1} wants to play again. Waiting for other player..."
                 })
-async def handle_piece_placed(room_code: str):
-    """Handle after a piece is placed"""
-    if room_code not in rooms:
-        return
-        
-    game = rooms[room_code]["game"]
-    is_ai_room = rooms[room_code].get("ai_mode", False)
-    
-    # Switch turns
-    game.current_turn = 1 - game.current_turn
-    game.reset_turn_timer()
-    
-    # Broadcast updated game state
-    await broadcast_game_state(room_code)
-    
-    # Handle AI turn if needed
-    if is_ai_room and game.current_turn == game.ai_player_id:
-        asyncio.create_task(handle_ai_turn(room_code))
-
-async def handle_piece_revealed(room_code: str, player_id: int, position: int):
+async def handle_piece_revealed(room: Room, player_id: int, position: int):
     """Handle after a piece is revealed"""
-    if room_code not in rooms:
+    if room.closed:
         return
         
-    game = rooms[room_code]["game"]
-    is_ai_room = rooms[room_code].get("ai_mode", False)
+    game = room.game
     
     result = game.reveal_piece(position, player_id)
     if result["success"]:
@@ -913,60 +1089,66 @@ async def handle_piece_revealed(room_code: str, player_id: int, position: int):
             # Monty Hall is now active
             if player_id == game.ai_player_id:
                 # AI needs to make Monty Hall choice
-                asyncio.create_task(handle_ai_monty_hall_choice(room_code, result))
+                _create_task(handle_ai_monty_hall_choice(room, result))
             else:
                 # Human player - show choice interface
-                player_ws = next((p["websocket"] for p in rooms[room_code]["players"] if p["id"] == player_id), None)
-                if player_ws:
-                    await player_ws.send_json({
+                player = room.get_player(player_id)
+                if player and player.get("out_queue"):
+                    enqueue_message(player, orjson.dumps({
                         "type": "monty_hall_info",
                         "monty_position": result["monty_position"],
                         "monty_symbol": result["monty_symbol"],
                         "piece_type": result["piece_type"],
                         "strategy_hint": result["strategy_hint"]
-                    })
+                    }))
             # Broadcast game state to show visual indicators
-            await broadcast_game_state(room_code)
+            room.broadcast_state()
         elif result.get("private_reveal"):
             # Original tile chosen - public reveal but send notification to current player only
             if not (player_id == game.ai_player_id):  # Don't send to AI
-                player_ws = next((p["websocket"] for p in rooms[room_code]["players"] if p["id"] == player_id), None)
-                if player_ws:
-                    await player_ws.send_json({
+                player = room.get_player(player_id)
+                if player and player.get("out_queue"):
+                    enqueue_message(player, orjson.dumps({
                         "type": "choice_info", 
                         "message": result["message"]
-                    })
-            await finish_turn(room_code)
+                    }))
+            advance_turn(room)
         elif result.get("public_reveal"):
             # Public reveal
-            await finish_turn(room_code)
+            advance_turn(room)
 
-async def finish_turn(room_code: str):
-    """Finish the current turn and switch to next player"""
-    if room_code not in rooms:
+def advance_turn(room: Room):
+    """Switch to the next player, restart the turn timer and broadcast the new state"""
+    # AI moves finish after an await, by which time the room may be gone
+    if room.closed:
         return
         
-    game = rooms[room_code]["game"]
-    is_ai_room = rooms[room_code].get("ai_mode", False)
-    
-    # Switch turns and broadcast
+    game = room.game
     game.current_turn = 1 - game.current_turn
     game.reset_turn_timer()
-    await broadcast_game_state(room_code)
+    schedule_turn_timeout(room)
+    room.broadcast_state()
     
     # Handle AI turn if needed
-    if is_ai_room and game.current_turn == game.ai_player_id and not game.game_over:
-        asyncio.create_task(handle_ai_turn(room_code))
+    if room.ai_mode and game.current_turn == game.ai_player_id and not game.game_over:
+        start_ai_turn(room)
+
+def start_ai_turn(room: Room):
+    """Start the AI's move unless one is already in progress"""
+    task = room.ai_task
+    # The running AI task may hand the next move to the AI again (the last placement
+    # leads straight into the AI's first reveal), so it can always schedule its successor
+    if task is None or task.done() or task is asyncio.current_task():
+        room.ai_task = _create_task(handle_ai_turn(room))
 
-async def handle_ai_turn(room_code: str):
+async def handle_ai_turn(room: Room):
     """Handle AI making a move"""
-    if room_code not in rooms:
+    if room.closed:
         return
         
-    game = rooms[room_code]["game"]
-    is_ai_room = rooms[room_code].get("ai_mode", False)
+    game = room.game
     
-    if not is_ai_room or game.current_turn != game.ai_player_id or game.game_over:
+    if not room.ai_mode or game.current_turn != game.ai_player_id or game.game_over:
         return
     
     # Check if AI is in Monty Hall state (should be handled by separate function)
@@ -981,12 +1163,12 @@ async def handle_ai_turn(room_code: str):
         # Execute the move
         if game_state["phase"] == "placement":
             if game.place_piece(position):
-                await handle_piece_placed(room_code)
+                advance_turn(room)
         elif game_state["phase"] == "reveal":
-            await handle_piece_revealed(room_code, game.ai_player_id, position)
+            await handle_piece_revealed(room, game.ai_player_id, position)
             
     except Exception as e:
-        print(f"AI turn error in room {room_code}: {e}")
+        logger.warning("AI turn error in room %s: %s", room.code, e)
         # On error, make random valid move
         valid_moves = get_valid_moves_for_game(game)
         if valid_moves:
@@ -995,16 +1177,16 @@ async def handle_ai_turn(room_code: str):
             game_state = game.get_state(game.ai_player_id)
             if game_state["phase"] == "placement":
                 if game.place_piece(position):
-                    await handle_piece_placed(room_code)
+                    advance_turn(room)
             elif game_state["phase"] == "reveal":
-                await handle_piece_revealed(room_code, game.ai_player_id, position)
+                await handle_piece_revealed(room, game.ai_player_id, position)
 
-async def handle_ai_monty_hall_choice(room_code: str, monty_hall_result: dict):
+async def handle_ai_monty_hall_choice(room: Room, monty_hall_result: dict):
     """Handle AI making a Monty Hall choice"""
-    if room_code not in rooms:
+    if room.closed:
         return
         
-    game = rooms[room_code]["game"]
+    game = room.game
     
     try:
         # Get AI choice
@@ -1016,77 +1198,71 @@ async def handle_ai_monty_hall_choice(room_code: str, monty_hall_result: dict):
             # AI chose original tile
             result = game._complete_private_reveal(game.monty_hall_state["original_position"])
             game.monty_hall_state = None
-            await finish_turn(room_code)
+            advance_turn(room)
         elif choice == "monty":
             # AI chose Monty Hall tile
             result = game._complete_public_reveal(game.monty_hall_state["monty_position"])
             game.monty_hall_state = None
-            await finish_turn(room_code)
+            advance_turn(room)
             
     except Exception as e:
-        print(f"AI Monty Hall error in room {room_code}: {e}")
+        logger.warning("AI Monty Hall error in room %s: %s", room.code, e)
         # Default to original choice on error
         result = game._complete_private_reveal(game.monty_hall_state["original_position"])
         game.monty_hall_state = None
-        await finish_turn(room_code)
+        advance_turn(room)
 
 def get_valid_moves_for_game(game) -> List[int]:
     """Get valid moves for current game state"""
-    valid_moves = []
-    
     if game.phase == "placement":
-        for i in range(9):
-            if game.board[i] is None and i != 4:  # Can't place on center
-                valid_moves.append(i)
+        # Empty cells; the center is always placed
+        free_mask = ALL_CELLS & ~game.placed_mask
     else:  # reveal phase
-        for i in range(9):
-            if game.board[i] == "placed" and not game.revealed_cells[i]:
-                valid_moves.append(i)
+        free_mask = game.placed_mask & ~game.revealed_mask
     
-    return valid_moves
+    return [i for i in range(9) if free_mask >> i & 1]
 
-async def broadcast_to_room(room_code: str, message: dict):
-    """Broadcast a message to all players in a room"""
-    if room_code not in connections:
-        return
-    
-    disconnected = []
-    for websocket in connections[room_code]:
-        try:
-            await websocket.send_json(message)
-        except:
-            disconnected.append(websocket)
-    
-    # Remove disconnected websockets
-    for ws in disconnected:
-        connections[room_code].remove(ws)
+async def send_message(websocket: WebSocket, message: dict):
+    """Send a message to a single socket as orjson-encoded bytes"""
+    await websocket.send_bytes(orjson.dumps(message))
 
-async def broadcast_game_state(room_code: str):
-    """Broadcast current game state to all players"""
-    if room_code not in rooms:
-        return
-        
-    game = rooms[room_code]["game"]
-    is_ai_room = rooms[room_code].get("ai_mode", False)
-    
-    for i, player in enumerate(rooms[room_code]["players"]):
-        # Skip AI players (they don't have websockets)
-        if player.get("is_ai", False) or not player.get("websocket"):
-            continue
+def enqueue_message(player: dict, payload: Optional[bytes]):
+    """Queue an encoded message for a client, dropping the oldest one if the client has fallen behind"""
+    queue = player["out_queue"]
+    if queue.full():
+        drop_oldest_message(player)
+    queue.put_nowait(payload)
+
+def drop_oldest_message(player: dict):
+    """Drop a client's oldest queued message"""
+    player["out_queue"].get_nowait()
+    # The dropped message may have been a state delta, so resync with a full state next time
+    player["state_version"] = None
+
+async def client_writer(websocket: WebSocket, queue: asyncio.Queue):
+    """Flush a client's outbound queue, coalescing queued messages into one newline-delimited frame"""
+    try:
+        closing = False
+        while not closing:
+            batch = [await queue.get()]
+            while not queue.empty() and len(batch) < MAX_BATCH_MESSAGES:
+                batch.append(queue.get_nowait())
             
-        try:
-            await player["websocket"].send_json({
-                "type": "game_state",
-                "data": game.get_state(i),
-                "room_info": {
-                    "code": room_code,
-                    "players": [{"id": p["id"], "name": p["name"], "is_ai": p.get("is_ai", False)} for p in rooms[room_code]["players"]],
-                    "waiting_for_player": len(rooms[room_code]["players"]) < (1 if is_ai_room else 2),
-                    "ai_mode": is_ai_room
-                }
-            })
-        except:
-            pass
+            # None marks the end of the stream; flush what came before it and close
+            if None in batch:
+                batch = batch[:batch.index(None)]
+                closing = True
+            if batch:
+                try:
+                    await asyncio.wait_for(websocket.send_bytes(b"\n".join(batch)), SEND_TIMEOUT)
+                except asyncio.TimeoutError:
+                    # Slow consumer; closing ends its receive loop, which cleans up the room
+                    await asyncio.wait_for(websocket.close(code=1008, reason="slow consumer"), SEND_TIMEOUT)
+                    return
+        await websocket.close()
+    except Exception as e:
+        # The socket went away under us; the receive loop handles the cleanup
+        logger.debug("Writer for %s stopped: %r", websocket.client, e)
 
 @app.get("/")
 async def get():
@@ -1109,59 +1285,25 @@ async def create_ai_room(difficulty: str = "expert"):
     
     # Initialize room with AI
     ai_player_id = 1  # AI is always player 1
-    rooms[room_code] = {
-        "players": [],
-        "game": Game(ai_mode=True, ai_player_id=ai_player_id, ai_difficulty=difficulty),
-        "chat_history": [],
-        "ai_mode": True,
-        "ai_player_id": ai_player_id,
-        "ai_difficulty": difficulty
-    }
-    connections[room_code] = []
+    room = rooms[room_code] = Room(
+        room_code,
+        Game(ai_mode=True, ai_player_id=ai_player_id, ai_difficulty=difficulty),
+        ai_mode=True,
+        ai_player_id=ai_player_id,
+        ai_difficulty=difficulty
+    )
+    
+    # The room exists before anyone connects, so drop it if nobody ever does
+    asyncio.get_running_loop().call_later(ROOM_IDLE_TTL, expire_idle_room, room)
     
     return {"room_code": room_code, "ai_mode": True, "difficulty": difficulty}
 
-@app.on_event("startup")
-async def startup_event():
-    asyncio.create_task(timer_update_loop())
-
-async def timer_update_loop():
-    """Periodically update turn timers for all active games"""
-    while True:
-        await asyncio.sleep(1)  # Update every second
-        
-        for room_code, room_data in rooms.items():
-            game = room_data["game"]
-            
-            if (game.turn_start_time is not None and 
-                not game.game_over and 
-                len(room_data["players"]) == 2):
-                
-                remaining_time = game.get_turn_time_remaining()
-                
-                # Check if time's up
-                if remaining_time <= 0:
-                    # Handle timeout
-                    timed_out = game.handle_turn_timeout()
-                    if timed_out:
-                        # Broadcast timeout message
-                        for player in room_data["players"]:
-                            try:
-                                await player["websocket"].send_json({
-                                    "type": "timeout",
-                                    "data": {
-                                        "message": f"Turn timeout! Player {2 - game.current_turn} ran out of time."
-                                    }
-                                })
-                            except:
-                                pass
-                        
-                        # Broadcast updated game state
-                        await broadcast_game_state(room_code)
-                else:
-                    # Send periodic updates
-                    await broadcast_game_state(room_code)
-
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # uvloop is not available on Windows, fall back to the default asyncio loop there
+    loop = "asyncio" if sys.platform == "win32" else "uvloop"
+    # permessage-deflate is negotiated per client; set WS_COMPRESSION=none to trade bandwidth for CPU
+    compression = os.getenv("WS_COMPRESSION", "deflate") != "none"
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop, http="httptools", ws="websockets",
+                ws_per_message_deflate=compression)
\ No newline at end of file
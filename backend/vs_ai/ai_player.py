@@ -1,17 +1,92 @@
 import random
 import asyncio
+from time import monotonic
 from typing import Dict, List, Tuple, Optional
-import copy
+
+# All possible lines (rows, columns, diagonals), and the lines through each cell
+LINES = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # rows
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # columns
+    (0, 4, 8), (2, 4, 6)  # diagonals
+)
+LINES_BY_CELL = tuple(tuple(line for line in LINES if cell in line) for cell in range(9))
+
+# Board bitmasks: bit i is set when cell i holds a piece
+ALL_CELLS = 0b111111111
+CENTER_BIT = 1 << 4  # The center is auto-placed, so it is never a placement move
+LINE_MASKS = tuple(sum(1 << pos for pos in line) for line in LINES)
+# Strategic position values (center is most valuable, corners next, edges least)
+POSITION_VALUES = (7, 4, 7, 4, 10, 4, 7, 4, 7)
+
+def _placement_value(placed_mask: int) -> int:
+    """Strategic value of a set of placed cells"""
+    score = 0
+    
+    # Add points for controlling strategic positions
+    for i in range(9):
+        if placed_mask >> i & 1:
+            score += POSITION_VALUES[i]
+    
+    # Add points for potential line completion opportunities
+    for line_mask in LINE_MASKS:
+        placed_in_line = bin(placed_mask & line_mask).count("1")
+        
+        # Prefer lines with good potential for reveals
+        if placed_in_line >= 2:
+            score += placed_in_line * 3
+    
+    return score
+
+# Placement evaluation for every possible board, indexed by placed mask; built once at import
+PLACEMENT_VALUES = tuple(_placement_value(mask) for mask in range(ALL_CELLS + 1))
+
+# The 8 rotations and reflections of the board, as the cell each cell maps to
+SYMMETRIES = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8),  # identity
+    (6, 3, 0, 7, 4, 1, 8, 5, 2),  # rotate 90
+    (8, 7, 6, 5, 4, 3, 2, 1, 0),  # rotate 180
+    (2, 5, 8, 1, 4, 7, 0, 3, 6),  # rotate 270
+    (2, 1, 0, 5, 4, 3, 8, 7, 6),  # mirror left-right
+    (6, 7, 8, 3, 4, 5, 0, 1, 2),  # mirror top-bottom
+    (0, 3, 6, 1, 4, 7, 2, 5, 8),  # main diagonal
+    (8, 5, 2, 7, 4, 1, 6, 3, 0)  # anti-diagonal
+)
+
+def _transform_mask(symmetry: Tuple[int, ...], mask: int) -> int:
+    """Apply a board symmetry to a cell bitmask"""
+    result = 0
+    for cell in range(9):
+        if mask >> cell & 1:
+            result |= 1 << symmetry[cell]
+    return result
+
+# For every mask, its smallest symmetric equivalent and the symmetry that produces it
+CANONICAL_FORMS = tuple(
+    min((_transform_mask(symmetry, mask), index) for index, symmetry in enumerate(SYMMETRIES))
+    for mask in range(ALL_CELLS + 1)
+)
+# Move bits mapped into and back out of each symmetry's frame
+SYMMETRY_BITS = tuple({1 << cell: 1 << symmetry[cell] for cell in range(9)} for symmetry in SYMMETRIES)
+INVERSE_SYMMETRY_BITS = tuple({to_bit: from_bit for from_bit, to_bit in bits.items()} for bits in SYMMETRY_BITS)
+
+# Transposition table entry flags: the stored score is exact, a lower bound or an upper bound
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+
+# Searched placement moves, keyed by (placed mask, depth). The search only depends on these,
+# so every AI shares the results; it fills up with the common openings first
+PLACEMENT_BOOK: Dict[Tuple[int, int], int] = {}
 
 class EntropyTicTacToeAI:
-    def __init__(self, ai_player_id: int, difficulty: str = "medium"):
+    def __init__(self, ai_player_id: int, difficulty: str = "medium", seed: Optional[int] = None):
         """
         Initialize AI player for Entropy TicTacToe
         
         Args:
             ai_player_id: The player ID (0 or 1) for the AI
             difficulty: "easy", "medium", "hard", "expert"
+            seed: Seed for the AI's own random generator, for reproducible play
         """
+        self._rng = random.Random(seed)
         self.ai_player_id = ai_player_id
         self.opponent_id = 1 - ai_player_id
         self.difficulty = difficulty
@@ -31,9 +106,28 @@ class EntropyTicTacToeAI:
             "expert": 0.0     # No random moves
         }
         
+        # How often the AI plays the optimal Monty Hall choice; easy has no strategy
+        self.monty_hall_optimal_rates = {
+            "easy": None,     # Switch-biased guess
+            "medium": 0.6,    # 60% optimal play
+            "hard": 0.85,     # 85% optimal play
+            "expert": 1.0     # Always optimal
+        }
+        
+        # Difficulty settings resolved once for the move paths
+        self._search_depth = self.depth_limits[difficulty]
+        self._random_move_chance = self.randomness[difficulty]
+        self._is_expert = difficulty == "expert"
+        self._add_reveal_noise = difficulty in ("easy", "medium")
+        self._monty_hall_optimal_rate = self.monty_hall_optimal_rates[difficulty]
+        
         # Track revealed symbol patterns
         self.symbol_pattern_knowledge = None  # Will be learned during game
         
+        # Placement search results for the current move, keyed by placed mask:
+        # (depth, flag, score, best move bit)
+        self._placement_tt: Dict[int, Tuple[int, int, float, int]] = {}
+        
     async def make_move(self, game_state, game_instance) -> int:
         """
         Make an AI move based on current game state
@@ -42,11 +136,18 @@ class EntropyTicTacToeAI:
             position (int): The position to place/reveal
         """
         # Add a small delay to make AI feel more natural
-        delay = random.uniform(0.5, 2.0) if self.difficulty != "expert" else random.uniform(0.2, 0.8)
-        await asyncio.sleep(delay)
+        delay = self._rng.uniform(0.5, 2.0) if not self._is_expert else self._rng.uniform(0.2, 0.8)
         
+        # Think first and only wait out the rest of the delay, so the search time is hidden in it
+        started = monotonic()
+        position = self._choose_move(game_state, game_instance)
+        await asyncio.sleep(max(0.0, delay - (monotonic() - started)))
+        return position
+    
+    def _choose_move(self, game_state, game_instance) -> int:
+        """Pick the move to play for the current phase"""
         # Check for random move based on difficulty
-        if random.random() < self.randomness[self.difficulty]:
+        if self._rng.random() < self._random_move_chance:
             return self._make_random_move(game_state, game_instance)
         
         if game_state["phase"] == "placement":
@@ -57,7 +158,7 @@ class EntropyTicTacToeAI:
     def _make_random_move(self, game_state, game_instance) -> int:
         """Make a random valid move"""
         valid_moves = self._get_valid_moves(game_state)
-        return random.choice(valid_moves) if valid_moves else 0
+        return self._rng.choice(valid_moves) if valid_moves else 0
     
     def _get_valid_moves(self, game_state) -> List[int]:
         """Get list of valid move positions"""
@@ -81,29 +182,41 @@ class EntropyTicTacToeAI:
         if not valid_moves:
             return 0
         
-        depth = self.depth_limits[self.difficulty]
+        depth = self._search_depth
         best_move = None
         best_score = float('-inf')
         
+        # Search over a bitmask of placed cells instead of copies of the state
+        placed_mask = 0
+        for i, cell in enumerate(game_state["board"]):
+            if cell is not None:
+                placed_mask |= 1 << i
+        
+        book_move = PLACEMENT_BOOK.get((placed_mask, depth))
+        if book_move is not None:
+            return book_move
+        
+        # Within one search the depth and side to move follow from the mask, so it is the key
+        self._placement_tt = {}
+        
         for position in valid_moves:
-            # Simulate the move
-            simulated_state = self._simulate_placement(game_state, position)
-            
-            # Evaluate the position using minimax
+            # Evaluate the move using minimax
             score = self._minimax_placement(
-                simulated_state, 
+                placed_mask | 1 << position,
                 depth - 1, 
                 False,  # Next move is opponent's
                 float('-inf'),
-                float('inf'),
-                game_instance
+                float('inf')
             )
             
             if score > best_score:
                 best_score = score
                 best_move = position
         
-        return best_move if best_move is not None else valid_moves[0]
+        if best_move is None:
+            best_move = valid_moves[0]
+        PLACEMENT_BOOK[placed_mask, depth] = best_move
+        return best_move
     
     def _make_reveal_move(self, game_state, game_instance) -> int:
         """Make a strategic reveal move using game knowledge and probabilities"""
@@ -114,13 +227,15 @@ class EntropyTicTacToeAI:
         # First, update our knowledge about symbol patterns
         self._update_symbol_knowledge(game_state)
         
-        depth = self.depth_limits[self.difficulty] 
         best_move = None
         best_score = float('-inf')
         
+        # The revealed symbol counts are the same for every candidate
+        revealed_x, revealed_o = self._count_revealed_symbols(game_state)
+        
         for position in valid_moves:
             # Calculate expected value for revealing this position
-            score = self._evaluate_reveal_position(position, game_state, game_instance)
+            score = self._evaluate_reveal_position(position, game_state, revealed_x, revealed_o)
             
             if score > best_score:
                 best_score = score
@@ -128,88 +243,70 @@ class EntropyTicTacToeAI:
         
         return best_move if best_move is not None else valid_moves[0]
     
-    def _simulate_placement(self, game_state, position: int) -> dict:
-        """Simulate placing a piece at the given position"""
-        simulated_state = copy.deepcopy(game_state)
-        simulated_state["board"][position] = "placed"
-        
-        # Check if placement phase is complete
-        placed_pieces = sum(1 for cell in simulated_state["board"] if cell is not None)
-        if placed_pieces == 9:
-            simulated_state["phase"] = "reveal"
-            simulated_state["current_turn"] = 0  # Reset to player 0 for reveal phase
+    def _minimax_placement(self, placed_mask: int, depth: int, is_maximizing: bool,
+                          alpha: float, beta: float) -> float:
+        """Minimax algorithm adapted for placement phase"""
+        # Placement ends once every cell holds a piece
+        if depth == 0 or placed_mask == ALL_CELLS:
+            return PLACEMENT_VALUES[placed_mask]
+        
+        # Different placement orders and symmetric boards have the same value, so reuse
+        # earlier results; the best move is stored in the canonical board's frame
+        key, symmetry = CANONICAL_FORMS[placed_mask]
+        hint_bit = 0
+        entry = self._placement_tt.get(key)
+        if entry is not None:
+            entry_depth, flag, value, hint_bit = entry
+            if entry_depth >= depth and (flag == TT_EXACT or (flag == TT_LOWER and value >= beta)
+                                         or (flag == TT_UPPER and value <= alpha)):
+                return value
+            hint_bit = INVERSE_SYMMETRY_BITS[symmetry][hint_bit]
+        
+        score, best_bit = self._search_placement(placed_mask, depth, is_maximizing, alpha, beta, hint_bit)
+        if score <= alpha:
+            flag = TT_UPPER
+        elif score >= beta:
+            flag = TT_LOWER
         else:
-            simulated_state["current_turn"] = 1 - simulated_state["current_turn"]
-        
-        return simulated_state
+            flag = TT_EXACT
+        self._placement_tt[key] = (depth, flag, score, SYMMETRY_BITS[symmetry][best_bit])
+        return score
     
-    def _minimax_placement(self, game_state, depth: int, is_maximizing: bool, 
-                          alpha: float, beta: float, game_instance) -> float:
-        """Minimax algorithm adapted for placement phase"""
-        if depth == 0 or self._is_placement_terminal(game_state):
-            return self._evaluate_placement_position(game_state, game_instance)
+    def _search_placement(self, placed_mask: int, depth: int, is_maximizing: bool,
+                          alpha: float, beta: float, hint_bit: int) -> Tuple[float, int]:
+        """Search the placement moves of a non-terminal position; returns the score and best move bit"""
+        # Make each move by setting its bit; the caller's mask is the unmade position
+        free = ALL_CELLS & ~placed_mask & ~CENTER_BIT
         
-        valid_moves = self._get_valid_moves(game_state)
+        # Try the best move from an earlier search first, then the lowest empty cells
+        bit = best_bit = hint_bit if hint_bit & free else free & -free
         
         if is_maximizing:
             max_score = float('-inf')
-            for position in valid_moves:
-                simulated_state = self._simulate_placement(game_state, position)
-                score = self._minimax_placement(simulated_state, depth - 1, False, alpha, beta, game_instance)
-                max_score = max(max_score, score)
+            while free:
+                free ^= bit
+                score = self._minimax_placement(placed_mask | bit, depth - 1, False, alpha, beta)
+                if score > max_score:
+                    max_score, best_bit = score, bit
                 alpha = max(alpha, score)
                 if beta <= alpha:
                     break  # Alpha-beta pruning
-            return max_score
+                bit = free & -free
+            return max_score, best_bit
         else:
             min_score = float('inf')
-            for position in valid_moves:
-                simulated_state = self._simulate_placement(game_state, position)
-                score = self._minimax_placement(simulated_state, depth - 1, True, alpha, beta, game_instance)
-                min_score = min(min_score, score)
+            while free:
+                free ^= bit
+                score = self._minimax_placement(placed_mask | bit, depth - 1, True, alpha, beta)
+                if score < min_score:
+                    min_score, best_bit = score, bit
                 beta = min(beta, score)
                 if beta <= alpha:
                     break  # Alpha-beta pruning
-            return min_score
-    
-    def _evaluate_placement_position(self, game_state, game_instance) -> float:
-        """Evaluate the strategic value of a placement position"""
-        score = 0
-        
-        # Strategic position values (center is most valuable, corners next, edges least)
-        position_values = {
-            4: 10,  # Center
-            0: 7, 2: 7, 6: 7, 8: 7,  # Corners
-            1: 4, 3: 4, 5: 4, 7: 4   # Edges
-        }
-        
-        # Add points for controlling strategic positions
-        for i, cell in enumerate(game_state["board"]):
-            if cell == "placed":
-                score += position_values.get(i, 0)
-        
-        # Add points for potential line completion opportunities
-        lines = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]  # diagonals
-        ]
-        
-        for line in lines:
-            placed_in_line = sum(1 for pos in line if game_state["board"][pos] == "placed")
-            empty_in_line = sum(1 for pos in line if game_state["board"][pos] is None)
-            
-            # Prefer lines with good potential for reveals
-            if placed_in_line >= 2:
-                score += placed_in_line * 3
-        
-        return score
-    
-    def _is_placement_terminal(self, game_state) -> bool:
-        """Check if placement phase is complete"""
-        return game_state["phase"] == "reveal"
+                bit = free & -free
+            return min_score, best_bit
     
-    def _evaluate_reveal_position(self, position: int, game_state, game_instance) -> float:
+    def _evaluate_reveal_position(self, position: int, game_state, revealed_x: int, revealed_o: int) -> float:
         """Evaluate the value of revealing a position"""
         score = 0
         probabilities = game_state["probabilities"][position]
@@ -221,7 +318,7 @@ class EntropyTicTacToeAI:
         
         # If we've identified the symbol pattern, use it
         if self.symbol_pattern_knowledge:
-            ai_symbol_prob = self._get_ai_symbol_probability(position, game_state)
+            ai_symbol_prob = self._get_ai_symbol_probability(position, game_state, revealed_x, revealed_o)
             
             # Strongly prefer high probability positions for our symbol
             if ai_symbol_prob > 70:
@@ -241,40 +338,34 @@ class EntropyTicTacToeAI:
         score += self._evaluate_tactical_position(position, game_state)
         
         # Add randomness for lower difficulties
-        if self.difficulty in ["easy", "medium"]:
-            score += random.uniform(-2, 2)
+        if self._add_reveal_noise:
+            score += self._rng.uniform(-2, 2)
         
         return score
     
     def _evaluate_tactical_position(self, position: int, game_state) -> float:
         """Evaluate tactical importance of a position (winning/blocking)"""
         score = 0
-        lines = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]  # diagonals
-        ]
-        
-        for line in lines:
-            if position in line:
-                revealed_symbols = []
-                unrevealed_count = 0
-                
-                for pos in line:
-                    if game_state["revealed_cells"][pos]:
-                        revealed_symbols.append(game_state["board"][pos])
-                    elif game_state["board"][pos] == "placed":
-                        unrevealed_count += 1
-                
-                # Check for potential wins/blocks
-                if len(revealed_symbols) == 2 and unrevealed_count == 1:
-                    if len(set(revealed_symbols)) == 1:  # Two same symbols
-                        # This could be a winning/blocking move
-                        score += 20
-                
-                # Value lines with revealed pieces (information value)
-                if revealed_symbols:
-                    score += len(revealed_symbols) * 2
+        
+        for line in LINES_BY_CELL[position]:
+            revealed_symbols = []
+            unrevealed_count = 0
+            
+            for pos in line:
+                if game_state["revealed_cells"][pos]:
+                    revealed_symbols.append(game_state["board"][pos])
+                elif game_state["board"][pos] == "placed":
+                    unrevealed_count += 1
+            
+            # Check for potential wins/blocks
+            if len(revealed_symbols) == 2 and unrevealed_count == 1:
+                if len(set(revealed_symbols)) == 1:  # Two same symbols
+                    # This could be a winning/blocking move
+                    score += 20
+            
+            # Value lines with revealed pieces (information value)
+            if revealed_symbols:
+                score += len(revealed_symbols) * 2
         
         return score
     
@@ -303,7 +394,18 @@ class EntropyTicTacToeAI:
                         }
                     break
     
-    def _get_ai_symbol_probability(self, position: int, game_state) -> float:
+    def _count_revealed_symbols(self, game_state) -> Tuple[int, int]:
+        """Count revealed X and O symbols in a single pass"""
+        revealed_x = revealed_o = 0
+        for revealed, cell in zip(game_state["revealed_cells"], game_state["board"]):
+            if revealed:
+                if cell == 'X':
+                    revealed_x += 1
+                elif cell == 'O':
+                    revealed_o += 1
+        return revealed_x, revealed_o
+    
+    def _get_ai_symbol_probability(self, position: int, game_state, revealed_x: int, revealed_o: int) -> float:
         """Get probability that the position contains AI's preferred symbol"""
         if not self.symbol_pattern_knowledge:
             return 50  # No knowledge yet
@@ -314,12 +416,6 @@ class EntropyTicTacToeAI:
         
         prob1, prob2 = probabilities
         
-        # Count revealed symbols to determine which symbol AI should prefer
-        revealed_x = sum(1 for i in range(9) 
-                        if game_state["revealed_cells"][i] and game_state["board"][i] == 'X')
-        revealed_o = sum(1 for i in range(9) 
-                        if game_state["revealed_cells"][i] and game_state["board"][i] == 'O')
-        
         # AI should prefer the symbol that appears to be in majority
         # or if unknown, prefer X if AI is player 0, O if player 1
         if revealed_x > revealed_o:
@@ -339,19 +435,23 @@ class EntropyTicTacToeAI:
     async def make_monty_hall_choice(self, game_state, monty_hall_state) -> str:
         """Make Monty Hall choice decision"""
         # Add thinking delay
-        delay = random.uniform(1.0, 3.0) if self.difficulty != "expert" else random.uniform(0.5, 1.5)
-        await asyncio.sleep(delay)
+        delay = self._rng.uniform(1.0, 3.0) if not self._is_expert else self._rng.uniform(0.5, 1.5)
         
-        # Strategic Monty Hall decision
-        original_pos = monty_hall_state["original_position"]
-        monty_pos = monty_hall_state["monty_position"]
-        monty_symbol = monty_hall_state["monty_symbol"]
+        # Decide first and only wait out the rest of the delay
+        started = monotonic()
+        choice = self._choose_monty_hall(game_state, monty_hall_state)
+        await asyncio.sleep(max(0.0, delay - (monotonic() - started)))
+        return choice
+    
+    def _choose_monty_hall(self, game_state, monty_hall_state) -> str:
+        """Choose between the original and the Monty Hall tile"""
+        optimal_rate = self._monty_hall_optimal_rate
+        if optimal_rate is None:
+            # Easy: Mostly random with slight bias toward switching (general Monty Hall advice)
+            return self._rng.choice(("original", "original", "monty", "monty", "monty"))
         
         # Get AI's symbol preference
-        revealed_x = sum(1 for i in range(9) 
-                        if game_state["revealed_cells"][i] and game_state["board"][i] == 'X')
-        revealed_o = sum(1 for i in range(9) 
-                        if game_state["revealed_cells"][i] and game_state["board"][i] == 'O')
+        revealed_x, revealed_o = self._count_revealed_symbols(game_state)
         
         # Determine what AI wants
         if revealed_x > revealed_o:
@@ -361,36 +461,12 @@ class EntropyTicTacToeAI:
         else:
             ai_wants = 'X' if self.ai_player_id == 0 else 'O'
         
-        # Smart Monty Hall strategy
-        if self.difficulty == "expert":
-            # Expert: Always use optimal Monty Hall strategy
-            # If revealed symbol is what we DON'T want, staying is better (67% vs 33%)
-            # If revealed symbol is what we DO want, switching is better
-            if monty_symbol != ai_wants:
-                return "original"  # Stay with original
-            else:
-                return "monty"  # Switch to revealed
-        
-        elif self.difficulty == "hard":
-            # Hard: Usually use optimal strategy with some randomness
-            if random.random() < 0.85:  # 85% optimal play
-                if monty_symbol != ai_wants:
-                    return "original"
-                else:
-                    return "monty"
-            else:
-                return random.choice(["original", "monty"])
-        
-        elif self.difficulty == "medium":
-            # Medium: Sometimes use optimal strategy
-            if random.random() < 0.6:  # 60% optimal play
-                if monty_symbol != ai_wants:
-                    return "original"
-                else:
-                    return "monty"
-            else:
-                return random.choice(["original", "monty"])
-        
-        else:  # Easy
-            # Easy: Mostly random with slight bias toward switching (general Monty Hall advice)
-            return random.choice(["original", "original", "monty", "monty", "monty"])  # Slight switch bias
\ No newline at end of file
+        # Optimal Monty Hall strategy:
+        # If revealed symbol is what we DON'T want, staying is better (67% vs 33%)
+        # If revealed symbol is what we DO want, switching is better
+        optimal = "original" if monty_hall_state["monty_symbol"] != ai_wants else "monty"
+        
+        # Expert always plays it; lower difficulties sometimes guess instead
+        if optimal_rate >= 1.0 or self._rng.random() < optimal_rate:
+            return optimal
+        return self._rng.choice(("original", "monty"))
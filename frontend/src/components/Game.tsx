@@ -12,6 +12,8 @@ interface GameProps {
   onBackToLobby: () => void;
 }
 
+const textDecoder = new TextDecoder();
+
 interface GameNotification {
   id: string;
   message: string;
@@ -29,6 +31,8 @@ const Game: React.FC<GameProps> = ({ roomCode, playerName, onBackToLobby }) => {
   const [showRules, setShowRules] = useState<boolean>(false);
   
   const wsRef = useRef<WebSocket | null>(null);
+  // Version of the last state applied; deltas only apply on top of the state they were built against
+  const stateVersionRef = useRef<number | null>(null);
 
   const addNotification = useCallback((message: string, type: 'success' | 'error' | 'info' | 'warning' = 'info') => {
     const id = Date.now().toString();
@@ -45,12 +49,26 @@ const Game: React.FC<GameProps> = ({ roomCode, playerName, onBackToLobby }) => {
       case 'game_state':
         if (message.data) {
           setGameState(message.data);
+          stateVersionRef.current = message.version ?? null;
         }
         if (message.room_info) {
           setRoomInfo(message.room_info);
         }
         break;
 
+      case 'game_state_delta':
+        // A delta against a state we never received would corrupt the board; the server
+        // sends a full state after dropping a message, so skip it until then
+        if (message.changes && message.base === stateVersionRef.current) {
+          const changes = message.changes;
+          stateVersionRef.current = message.version ?? null;
+          setGameState(prevGameState => {
+            if (!prevGameState) return prevGameState;
+            return { ...prevGameState, ...changes };
+          });
+        }
+        break;
+
       case 'player_joined':
         if (message.room_info) {
           setRoomInfo(message.room_info);
@@ -124,6 +142,8 @@ const Game: React.FC<GameProps> = ({ roomCode, playerName, onBackToLobby }) => {
       
       const wsUrl = process.env.REACT_APP_WS_URL || 'ws://localhost:8000';
       const ws = new WebSocket(`${wsUrl}/ws/${roomCode}`);
+      // Server sends pre-encoded JSON as binary frames
+      ws.binaryType = 'arraybuffer';
       wsRef.current = ws;
 
       ws.onopen = () => {
@@ -140,8 +160,13 @@ const Game: React.FC<GameProps> = ({ roomCode, playerName, onBackToLobby }) => {
 
       ws.onmessage = (event) => {
         try {
-          const message: WebSocketMessage = JSON.parse(event.data);
-          handleWebSocketMessage(message);
+          const text = typeof event.data === 'string' ? event.data : textDecoder.decode(event.data);
+          // A frame can carry several newline-delimited messages
+          text.split('\n').forEach((line: string) => {
+            if (!line) return;
+            const message: WebSocketMessage = JSON.parse(line);
+            handleWebSocketMessage(message);
+          });
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
         }
@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { GameState, RoomInfo, Player } from '../types';
 
 interface GameStatusBarProps {
@@ -14,6 +14,26 @@ const GameStatusBar: React.FC<GameStatusBarProps> = ({
   currentPlayer,
   isMyTurn
 }) => {
+  const [timeRemaining, setTimeRemaining] = useState<number | null>(null);
+
+  // The server only sends the remaining time with state updates, so count down locally
+  useEffect(() => {
+    if (gameState.turn_time_remaining === undefined || gameState.turn_time_remaining === null) {
+      setTimeRemaining(null);
+      return;
+    }
+
+    const deadline = Date.now() + gameState.turn_time_remaining * 1000;
+    const updateRemaining = () => {
+      setTimeRemaining(Math.max(0, Math.ceil((deadline - Date.now()) / 1000)));
+    };
+
+    updateRemaining();
+    const interval = setInterval(updateRemaining, 250);
+    return () => clearInterval(interval);
+    // turn_id changes on every timer restart, even when the turn and remaining time look the same
+  }, [gameState.turn_time_remaining, gameState.turn_id]);
+
   const getCurrentTurnPlayer = (): Player | null => {
     if (!roomInfo) return null;
     return roomInfo.players.find(p => p.id === gameState.current_turn) || null;
@@ -80,9 +100,9 @@ const GameStatusBar: React.FC<GameStatusBarProps> = ({
         </div>
         {getGameStatus()}
         
-        {!gameState.game_over && gameState.turn_time_remaining !== undefined && gameState.turn_time_remaining !== null && (
-          <div className={`turn-timer ${(gameState.turn_time_remaining || 0) <= 10 ? 'urgent' : ''}`}>
-            Time: {gameState.turn_time_remaining || 0}s
+        {!gameState.game_over && timeRemaining !== null && (
+          <div className={`turn-timer ${timeRemaining <= 10 ? 'urgent' : ''}`}>
+            Time: {timeRemaining}s
           </div>
         )}
       </div>
@@ -10,6 +10,7 @@ export interface GameState {
   play_again_votes?: boolean[];
   turn_time_remaining?: number;
   turn_timeout?: number;
+  turn_id?: number;  // Changes whenever the turn timer restarts
   monty_hall_state?: {
     player_id: number;
     original_position: number;
@@ -39,7 +40,11 @@ export interface WebSocketMessage {
   player_id?: number;
   player_name?: string;
   message?: string;
-  timestamp?: string;
+  timestamp?: number;  // Epoch seconds
+  // State delta properties
+  version?: number;
+  base?: number;
+  changes?: Partial<GameState>;
   // Monty Hall specific properties
   original_position?: number;
   revealed_position?: number;